@@ -27,3 +27,15 @@ if DATABASE_URL.startswith("sqlite:///") and not DATABASE_URL.startswith("sqlite
 # Application Settings
 DEBUG = os.getenv("DEBUG", "False").lower() == "true"
 DEBUG_PAYLOAD_LOGGING = os.getenv("DEBUG_PAYLOAD_LOGGING", "True").lower() == "true"
+
+# Run a tiny PDF through PyMuPDF and MarkItDown on startup, so the first upload doesn't pay their warm-up cost
+PREWARM_PDF_EXTRACTION = os.getenv("PREWARM_PDF_EXTRACTION", "True").lower() == "true"
+
+# Seconds a scraped job description is reused for repeat scrapes of the same URL (0 disables the cache)
+JD_CACHE_TTL = int(os.getenv("JD_CACHE_TTL", "3600"))
+
+# Directory for rendered PDFs, keyed by a hash of their HTML so unchanged documents aren't re-rendered
+# (unset disables the cache). Relative paths are resolved against BASE_DIR, e.g. "data/pdf_cache".
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", "")
+if PDF_CACHE_DIR and not os.path.isabs(PDF_CACHE_DIR):
+    PDF_CACHE_DIR = str(BASE_DIR / PDF_CACHE_DIR)
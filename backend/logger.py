@@ -30,9 +30,16 @@ def log_debug(message: str):
         console.print(f"[bold blue]DEBUG:[/bold blue] {message}")
 
 
-def log_error(message: str):
-    """Print an error message (always printed)."""
+def log_error(message: str, exc_info: bool = False):
+    """
+    Print an error message (always printed).
+
+    With exc_info=True, the exception being handled is also printed as a traceback if config.DEBUG is True;
+    the traceback is only formatted when it is printed.
+    """
     console.print(f"[bold red]ERROR:[/bold red] {message}")
+    if exc_info and config.DEBUG:
+        console.print_exception()
 
 
 async def log_requests_middleware(request, call_next):
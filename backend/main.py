@@ -1,7 +1,10 @@
+import asyncio
+import hashlib
 import os
-import traceback
+from contextlib import asynccontextmanager
 from datetime import UTC, datetime
 from io import BytesIO
+from pathlib import Path
 from typing import List
 
 import docx
@@ -16,6 +19,7 @@ from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from weasyprint import HTML
+from weasyprint.text.fonts import FontConfiguration
 
 import config
 import models
@@ -34,7 +38,13 @@ from prompts import (
     get_initial_matching_prompt,
     get_regeneration_prompt,
 )
-from tools import extract_text_from_pdf, scrape_job_description
+from tools import (
+    close_http_client,
+    extract_text_from_pdf_async,
+    prewarm_pdf_extraction,
+    scrape_job_description,
+    strip_markdown_fences,
+)
 
 # Initialize Logfire for elegant AI monitoring
 # send_to_logfire=False ensures it runs in local console mode without requiring an account/login
@@ -49,7 +59,23 @@ run_migrations()
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="JobFit API", description="AI-powered resume matching service", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if config.PREWARM_PDF_EXTRACTION:
+        await asyncio.to_thread(prewarm_pdf_extraction)
+    yield
+    # Release the scraper's pooled connections
+    await close_http_client()
+
+
+# Shared by every PDF render; WeasyPrint otherwise builds a new font configuration for each write_pdf() call
+PDF_FONT_CONFIG = FontConfiguration()
+
+# Most rendered PDFs kept in config.PDF_CACHE_DIR; the least recently used are removed beyond this
+PDF_CACHE_MAX_FILES = 256
+
+app = FastAPI(title="JobFit API", description="AI-powered resume matching service", version="1.0.0", lifespan=lifespan)
 
 logfire.instrument_fastapi(app)
 
@@ -98,7 +124,9 @@ class ResumeUpdateRequest(BaseModel):
     is_selected: bool
 
 
-class JobResponse(BaseModel):
+class JobSummary(BaseModel):
+    """The columns the job list renders; leaves out the large text fields."""
+
     model_config = {"from_attributes": True}
 
     id: int
@@ -108,10 +136,13 @@ class JobResponse(BaseModel):
     title: str
     match_score: int | None = None
     status: str
+    created_at: datetime
+
+
+class JobResponse(JobSummary):
     job_description: str | None = None
     resume: str | None = None
     cover_letter: str | None = None
-    created_at: datetime
 
 
 class RegenerateResponse(BaseModel):
@@ -180,7 +211,7 @@ async def upload_resume(file: UploadFile = File(...), name: str = Form(None), db
     file_bytes = await file.read()
 
     # Extract text using our tool
-    content = extract_text_from_pdf(file_bytes)
+    content = await extract_text_from_pdf_async(file_bytes)
 
     if content.startswith("Error:"):
         raise HTTPException(status_code=400, detail=content)
@@ -259,20 +290,10 @@ async def add_resume_manual(request: ResumeManualRequest, db: Session = Depends(
         log_ai_interaction("CLEAN RESUME RESPONSE", cleaned_content, "green")
 
         # Strip markdown code fences if present (AI sometimes wraps in ```markdown```)
-        cleaned_content = cleaned_content.strip()
-        if cleaned_content.startswith("```markdown") or cleaned_content.startswith("```"):
-            lines = cleaned_content.split("\n")
-            # Remove first line if it's a code fence
-            if lines[0].startswith("```"):
-                lines.pop(0)
-            # Remove last line if it's a closing fence
-            if lines and lines[-1].strip() == "```":
-                lines.pop()
-            cleaned_content = "\n".join(lines)
+        cleaned_content = strip_markdown_fences(cleaned_content)
 
     except Exception as e:
-        log_error(f"Resume cleaning failed: {str(e)}")
-        log_debug(f"Full Error Traceback:\n{traceback.format_exc()}")
+        log_error(f"Resume cleaning failed: {str(e)}", exc_info=True)
         # Fallback to raw content if cleaning fails
         cleaned_content = request.content
 
@@ -373,6 +394,67 @@ async def set_selected_resume(resume_id: int, db: Session = Depends(get_db)):
     )
 
 
+def render_pdf(html: str) -> bytes:
+    """
+    Renders HTML to PDF bytes with WeasyPrint.
+
+    When config.PDF_CACHE_DIR is set, renders are stored there by a hash of the HTML, so downloading an
+    unchanged resume or cover letter again (also after a restart, or from another worker) skips WeasyPrint.
+    """
+    if not config.PDF_CACHE_DIR:
+        return HTML(string=html).write_pdf(font_config=PDF_FONT_CONFIG)
+
+    cache_dir = Path(config.PDF_CACHE_DIR)
+    cached_path = cache_dir / f"{hashlib.sha256(html.encode()).hexdigest()}.pdf"
+    try:
+        pdf_bytes = cached_path.read_bytes()
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        log_error(f"Could not read PDF cache entry: {e}")
+    else:
+        try:
+            os.utime(cached_path)  # Mark as recently used
+        except OSError as e:
+            # Read-only mount or a file owned by another worker; the bytes are still good
+            log_debug(f"Could not update PDF cache entry timestamp: {e}")
+        log_debug(f"PDF cache hit: {cached_path.name}")
+        return pdf_bytes
+
+    pdf_bytes = HTML(string=html).write_pdf(font_config=PDF_FONT_CONFIG)
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        # Write under a temporary name and rename, so a concurrent reader never sees a partial file
+        temp_path = cached_path.with_suffix(f".{os.getpid()}.tmp")
+        temp_path.write_bytes(pdf_bytes)
+        os.replace(temp_path, cached_path)
+    except OSError as e:
+        log_error(f"Could not write PDF cache entry: {e}")
+        return pdf_bytes
+
+    prune_pdf_cache(cache_dir)
+    return pdf_bytes
+
+
+def prune_pdf_cache(cache_dir: Path) -> None:
+    """
+    Deletes the least recently used renders beyond PDF_CACHE_MAX_FILES.
+
+    Other workers may delete files concurrently, so entries that vanish while pruning are skipped.
+    """
+    try:
+        mtimes = {}
+        for path in cache_dir.glob("*.pdf"):
+            try:
+                mtimes[path] = path.stat().st_mtime
+            except FileNotFoundError:
+                continue
+        for stale_path in sorted(mtimes, key=mtimes.get)[:-PDF_CACHE_MAX_FILES]:
+            stale_path.unlink(missing_ok=True)
+    except OSError as e:
+        log_debug(f"Could not prune PDF cache: {e}")
+
+
 @app.get("/api/resumes/{resume_id}/pdf")
 async def generate_resume_pdf(resume_id: int, db: Session = Depends(get_db)):
     """Generate a PDF from an uploaded resume (Markdown content)."""
@@ -416,7 +498,7 @@ async def generate_resume_pdf(resume_id: int, db: Session = Depends(get_db)):
     """
 
     try:
-        pdf_bytes = HTML(string=styled_html).write_pdf()
+        pdf_bytes = render_pdf(styled_html)
 
         safe_filename = re.sub(r"[^\w\.\-]", "_", f"{resume.name}.pdf")
         log_debug(f"Successfully generated PDF for resume: {safe_filename} ({len(pdf_bytes)} bytes)")
@@ -431,8 +513,7 @@ async def generate_resume_pdf(resume_id: int, db: Session = Depends(get_db)):
             },
         )
     except Exception as e:
-        log_error(f"Resume PDF generation failed: {str(e)}")
-        log_debug(traceback.format_exc())
+        log_error(f"Resume PDF generation failed: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"PDF generation failed: {str(e)}")
 
 
@@ -556,8 +637,7 @@ async def generate_resume_docx(resume_id: int, db: Session = Depends(get_db)):
             },
         )
     except Exception as e:
-        log_error(f"Resume DOCX generation failed: {str(e)}")
-        log_debug(traceback.format_exc())
+        log_error(f"Resume DOCX generation failed: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Word document generation failed: {str(e)}")
 
 
@@ -788,15 +868,27 @@ async def analyze_job(request: AnalyzeJobRequest, db: Session = Depends(get_db))
     except HTTPException:
         raise
     except Exception as e:
-        log_error(f"Analysis failed with exception: {str(e)}")
-        log_debug(traceback.format_exc())
+        log_error(f"Analysis failed with exception: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
 
-@app.get("/api/jobs", response_model=List[JobResponse])
+@app.get("/api/jobs", response_model=List[JobSummary])
 async def get_jobs(db: Session = Depends(get_db)):
-    """Get all job applications."""
-    jobs = db.query(models.Job).order_by(models.Job.created_at.desc()).all()
+    """Get all job applications (summary columns only; use /api/jobs/{job_id} for the full job)."""
+    jobs = (
+        db.query(
+            models.Job.id,
+            models.Job.resume_id,
+            models.Job.url,
+            models.Job.company,
+            models.Job.title,
+            models.Job.match_score,
+            models.Job.status,
+            models.Job.created_at,
+        )
+        .order_by(models.Job.created_at.desc())
+        .all()
+    )
     return jobs
 
 
@@ -911,7 +1003,7 @@ async def generate_pdf(
 
     # Generate PDF using WeasyPrint
     try:
-        pdf_bytes = HTML(string=html_content).write_pdf()
+        pdf_bytes = render_pdf(html_content)
 
         # Return as downloadable file
         import re
@@ -932,8 +1024,7 @@ async def generate_pdf(
         )
 
     except Exception as e:
-        log_error(f"PDF generation failed for Job ID {job_id}: {str(e)}")
-        log_debug(traceback.format_exc())
+        log_error(f"PDF generation failed for Job ID {job_id}: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"PDF generation failed: {str(e)}")
 
 
@@ -1012,8 +1103,7 @@ async def generate_job_docx(
             },
         )
     except Exception as e:
-        log_error(f"DOCX generation failed for Job ID {job_id}: {str(e)}")
-        log_debug(traceback.format_exc())
+        log_error(f"DOCX generation failed for Job ID {job_id}: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Word document generation failed: {str(e)}")
 
 
@@ -1127,8 +1217,7 @@ async def regenerate_job_content(job_id: int, request: RegenerateRequest, db: Se
             raise HTTPException(status_code=500, detail="Failed to get data from agent")
 
     except Exception as e:
-        log_error(f"Regeneration failed: {str(e)}")
-        log_debug(traceback.format_exc())
+        log_error(f"Regeneration failed: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Regeneration failed: {str(e)}")
 
 
@@ -1,22 +1,78 @@
 import logging
 
+from sqlalchemy import DateTime, inspect, text
+
+from database import engine
+from tools import strip_markdown_fences
+
 logger = logging.getLogger(__name__)
 
 
-def run_migrations():
-    """
-    Placeholder for future database migrations.
+def add_resume_timestamps(conn):
+    """Add the created_at/updated_at columns to resumes created before they existed."""
+    inspector = inspect(conn)
+    if not inspector.has_table("resumes"):
+        return
+
+    columns = {column["name"] for column in inspector.get_columns("resumes")}
+    column_type = DateTime().compile(dialect=conn.dialect)
+    for column in ("created_at", "updated_at"):
+        if column not in columns:
+            conn.execute(text(f"ALTER TABLE resumes ADD COLUMN {column} {column_type}"))
+            conn.execute(text(f"UPDATE resumes SET {column} = CURRENT_TIMESTAMP WHERE {column} IS NULL"))
+
+
+def strip_resume_fences(conn):
+    """Remove code fences that older clean-up runs left around stored resume content."""
+    if not inspect(conn).has_table("resumes"):
+        return
+
+    rows = conn.execute(text("SELECT id, content FROM resumes WHERE content LIKE '```%'")).all()
+    if rows:
+        conn.execute(
+            text("UPDATE resumes SET content = :content WHERE id = :id"),
+            [{"id": row.id, "content": strip_markdown_fences(row.content)} for row in rows],
+        )
+
 
-    Since we are in early development and don't have production users,
-    we prefer to let SQLAlchemy's create_all() handle the initial
-    schema creation.
+def add_job_status_index(conn):
+    """Create the Job.status index on databases built before the column was indexed."""
+    if not inspect(conn).has_table("jobs"):
+        return
 
-    If you make schema changes, you can add logic here to update existing
-    SQLite files, or simply delete your local jobfit.db to start fresh.
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_jobs_status ON jobs (status)"))
+
+
+# Ordered (version, migration) pairs. Never renumber or remove an entry; append new ones.
+MIGRATIONS = [
+    (1, add_resume_timestamps),
+    (2, strip_resume_fences),
+    (3, add_job_status_index),
+]
+
+
+def run_migrations(bind=engine):
     """
-    # For now, we are letting the app start fresh.
-    # Future migration logic (e.g. adding new columns to existing DBs) goes here.
-    pass
+    Apply pending database migrations.
+
+    Applied versions are recorded in the schema_migrations table, so each step runs
+    exactly once per database and a regular boot only costs a single SELECT.
+    On a fresh database the tables don't exist yet; the steps are recorded as applied
+    and create_all() builds the current schema afterwards.
+    """
+    with bind.begin() as conn:
+        conn.execute(text("CREATE TABLE IF NOT EXISTS schema_migrations (version INTEGER PRIMARY KEY)"))
+        applied = set(conn.execute(text("SELECT version FROM schema_migrations")).scalars())
+
+    for version, migration in MIGRATIONS:
+        if version in applied:
+            continue
+
+        # One transaction per step: a failing step is rolled back and not recorded
+        with bind.begin() as conn:
+            migration(conn)
+            conn.execute(text("INSERT INTO schema_migrations (version) VALUES (:version)"), {"version": version})
+        logger.info(f"Applied migration {version}: {migration.__name__}")
 
 
 if __name__ == "__main__":
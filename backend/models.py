@@ -43,7 +43,9 @@ class Job(Base):
     resume: Mapped[str]
     cover_letter: Mapped[Optional[str]]
     match_score: Mapped[Optional[int]]
-    status: Mapped[JobStatus] = mapped_column(SQLEnum(JobStatus), default=JobStatus.todo)
+    status: Mapped[JobStatus] = mapped_column(
+        SQLEnum(JobStatus, native_enum=False, length=16), default=JobStatus.todo, index=True
+    )
     created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(UTC))
 
     # Relationship to Resume
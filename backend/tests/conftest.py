@@ -8,157 +8,403 @@ This follows SQLAlchemy 2.0 and FastAPI best practices:
 4. More maintainable and reusable
 """
 
+import functools
+import hashlib
+import os
+import shutil
 import subprocess
 import sys
-from unittest.mock import Mock
+from types import ModuleType
 
+import httpx
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, insert
 from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.pool import StaticPool
 
-# Mock WeasyPrint before importing main
-mock_weasy = Mock()
-mock_html = Mock()
-mock_html.write_pdf.return_value = b"%PDF-mock-content"
-mock_weasy.HTML.return_value = mock_html
-sys.modules["weasyprint"] = mock_weasy
 
-from database import Base, get_db  # noqa: E402
-from main import app  # noqa: E402
+class _HTMLStub:
+    """Stand-in for weasyprint.HTML: accepts any arguments and renders a fixed fake PDF."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def write_pdf(self, *args, **kwargs):
+        return b"%PDF-mock-content"
+
+
+class _FontConfigurationStub:
+    """Stand-in for weasyprint.text.fonts.FontConfiguration."""
+
+
+# Stub WeasyPrint (and its native libraries) out before importing main
+weasyprint_stub = ModuleType("weasyprint")
+weasyprint_stub.HTML = _HTMLStub
+weasyprint_fonts_stub = ModuleType("weasyprint.text.fonts")
+weasyprint_fonts_stub.FontConfiguration = _FontConfigurationStub
+sys.modules["weasyprint"] = weasyprint_stub
+sys.modules["weasyprint.text"] = ModuleType("weasyprint.text")
+sys.modules["weasyprint.text.fonts"] = weasyprint_fonts_stub
+
+# Point the app's own engine at a private in-memory database. Importing main runs migrations and
+# create_all at import time; without this every test process (one per pytest-xdist worker) would
+# race on the shared data/jobfit.db file. "sqlite://" is used because config rewrites "sqlite:///" paths.
+os.environ["DATABASE_URL"] = "sqlite://"
+# Tests mock PDF extraction, so the startup prewarm would only slow down the TestClient start
+os.environ["PREWARM_PDF_EXTRACTION"] = "False"
+# Scrapes must hit each test's mocked client; tests of the cache itself enable it explicitly
+os.environ["JD_CACHE_TTL"] = "0"
+os.environ["PDF_CACHE_DIR"] = ""
+
+
+def _get_app():
+    """Import the FastAPI app on first use, so --collect-only, --help and narrow -k runs skip building it."""
+    import main
+
+    return main.app
+
 
 # Use in-memory SQLite for faster tests
 SQLALCHEMY_TEST_DATABASE_URL = "sqlite:///:memory:"
 
-# Create test engine with special settings for SQLite
+# Create test engine with special settings for SQLite.
+# Every pytest-xdist worker is its own process importing this module, so each gets a private engine and database.
 engine = create_engine(
     SQLALCHEMY_TEST_DATABASE_URL,
     connect_args={"check_same_thread": False},
     poolclass=StaticPool,  # Keep connection alive for in-memory DB
 )
 
+
+@event.listens_for(engine, "connect")
+def _set_test_pragmas(dbapi_connection, connection_record):
+    """No durability needed for tests: keep journal and temp data in memory and skip syncs."""
+    cursor = dbapi_connection.cursor()
+    for pragma in (
+        "journal_mode=MEMORY",
+        "synchronous=OFF",
+        "temp_store=MEMORY",
+        "locking_mode=EXCLUSIVE",
+    ):
+        cursor.execute(f"PRAGMA {pragma}")
+    cursor.close()
+
+
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
 @pytest.fixture(scope="session", autouse=True)
 def setup_test_database():
-    """Create all tables once for the entire test session."""
+    """
+    Create all tables once for the entire test session.
+
+    Tests never touch the schema; isolation comes purely from savepoint rollback. There is
+    nothing to drop afterwards either: disposing the engine discards the in-memory database.
+    """
+    import models  # noqa: F401  (registers the tables on Base.metadata)
+    from database import Base
+
     Base.metadata.create_all(bind=engine)
     yield
-    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
 
 
-def pytest_sessionstart(session):
-    """Automatically run ruff check and format check before starting tests."""
-    from pathlib import Path
+def _blocked_network(*args, **kwargs):
+    raise httpx.ConnectError("Network access is disabled during tests")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def no_network():
+    """
+    Fail fast on any real outbound HTTP request made through httpx (scraper, LLM clients).
+
+    Only the network transports are blocked; TestClient uses its own in-process transport.
+    Tests that need a response patch the client or the calling function as before.
+    """
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(httpx.HTTPTransport, "handle_request", _blocked_network)
+        mp.setattr(httpx.AsyncHTTPTransport, "handle_async_request", _blocked_network)
+        yield
 
-    # Try to find ruff in the same directory as the python executable
-    python_path = Path(sys.executable)
-    ruff_bin = "ruff"  # Default to path
 
-    # If we are in a virtual environment, look in the bin/Scripts folder
-    if (python_path.parent / "ruff").exists():
-        ruff_bin = str(python_path.parent / "ruff")
-    elif (python_path.parent / "ruff.exe").exists():
-        ruff_bin = str(python_path.parent / "ruff.exe")
+# pytest cache key holding the digest of the last lint inputs that passed Ruff
+RUFF_CACHE_KEY = "jobfit/ruff_passed_digest"
+
+
+def _lint_inputs_digest(ruff_bin):
+    """Digest of everything a Ruff run depends on: interpreter, Ruff binary and the stat of each source/config file."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(sys.version.encode())
+
+    ruff_path = shutil.which(ruff_bin)
+    if ruff_path:
+        ruff_stat = os.stat(ruff_path)
+        digest.update(f"{ruff_path}:{ruff_stat.st_mtime_ns}:{ruff_stat.st_size}\n".encode())
+
+    for root, dirs, files in os.walk("."):
+        # Prune hidden folders (.venv, .ruff_cache, .pytest_cache, ...) and bytecode caches
+        dirs[:] = sorted(d for d in dirs if not d.startswith(".") and d != "__pycache__")
+        for name in sorted(files):
+            if name.endswith(".py") or name == "pyproject.toml":
+                path = os.path.join(root, name)
+                file_stat = os.stat(path)
+                digest.update(f"{path}:{file_stat.st_mtime_ns}:{file_stat.st_size}\n".encode())
+
+    return digest.hexdigest()
+
+
+@functools.lru_cache(maxsize=1)
+def _ruff_bin():
+    """
+    Resolve the Ruff executable once: PYTEST_RUFF_BIN, then the interpreter's bin/Scripts folder, then PATH.
+
+    Returns None when Ruff is not installed anywhere.
+    """
+    override = os.environ.get("PYTEST_RUFF_BIN")
+    if override:
+        return override
+
+    # Search the virtual environment's bin/Scripts folder before PATH (which also handles PATHEXT on Windows)
+    search_path = os.pathsep.join([os.path.dirname(sys.executable), os.environ.get("PATH", "")])
+    return shutil.which("ruff", path=search_path)
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--lint",
+        action="store_true",
+        default=False,
+        help="Run ruff check and ruff format --check before the tests (also enabled by PYTEST_RUN_RUFF=1).",
+    )
+
+
+def pytest_sessionstart(session):
+    """Run ruff check and format check before starting tests when --lint (or PYTEST_RUN_RUFF=1) is given."""
+    if not (session.config.getoption("--lint") or os.environ.get("PYTEST_RUN_RUFF") == "1"):
+        return
+
+    # Ruff already ran in this pipeline (pre-commit hook or a separate lint step)
+    if os.environ.get("PRE_COMMIT") == "1" or os.environ.get("SKIP_RUFF") == "1":
+        print("\nRuff: skipped (PRE_COMMIT=1 or SKIP_RUFF=1).\n")
+        return
+
+    # Under pytest-xdist the controller runs the gate once; the workers skip it
+    if os.environ.get("PYTEST_XDIST_WORKER"):
+        return
+
+    ruff_bin = _ruff_bin()
+    if ruff_bin is None:
+        print("Warning: 'ruff' not found. Skipping linting checks.")
+        return
+
+    # Skip both Ruff runs when nothing changed since the last passing run
+    cache = getattr(session.config, "cache", None)
+    inputs_digest = _lint_inputs_digest(ruff_bin)
+    if cache is not None and cache.get(RUFF_CACHE_KEY, None) == inputs_digest:
+        print("\nRuff: cache hit, no changes since the last passing run.\n")
+        return
 
     print(f"\n--- Running Ruff Linter & Formatter ({ruff_bin}) ---")
 
-    # 1. Check Linting
+    # Start both checks at once; each walks and parses the tree on its own, so they overlap well
     try:
-        lint_result = subprocess.run([ruff_bin, "check", ".", "--ignore", "E501"], capture_output=True, text=True)
-        if lint_result.returncode != 0:
-            print(lint_result.stdout)
-            print(lint_result.stderr)
-            pytest.exit("Linting failed. Please fix ruff errors before running tests.", returncode=1)
-
-        # 2. Check Formatting
-        format_result = subprocess.run([ruff_bin, "format", "--check", "."], capture_output=True, text=True)
-        if format_result.returncode != 0:
-            print(format_result.stdout)
-            print(format_result.stderr)
-            pytest.exit("Formatting failed. Please run 'ruff format .' before running tests.", returncode=1)
-
-        print("Ruff: All checks passed!\n")
+        lint_proc = subprocess.Popen(
+            [ruff_bin, "check", ".", "--ignore", "E501"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+        )
+        format_proc = subprocess.Popen(
+            [ruff_bin, "format", "--check", "."], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+        )
     except FileNotFoundError:
         print(f"Warning: '{ruff_bin}' not found. Skipping linting checks.")
+        return
+
+    lint_stdout, lint_stderr = lint_proc.communicate()
+    format_stdout, format_stderr = format_proc.communicate()
+
+    # 1. Check Linting
+    if lint_proc.returncode != 0:
+        print(lint_stdout)
+        print(lint_stderr)
+        pytest.exit("Linting failed. Please fix ruff errors before running tests.", returncode=1)
+
+    # 2. Check Formatting
+    if format_proc.returncode != 0:
+        print(format_stdout)
+        print(format_stderr)
+        pytest.exit("Formatting failed. Please run 'ruff format .' before running tests.", returncode=1)
+
+    print("Ruff: All checks passed!\n")
+    if cache is not None:
+        cache.set(RUFF_CACHE_KEY, inputs_digest)
+
+
+@pytest.fixture(scope="session")
+def connection(setup_test_database):
+    """The single connection shared by all tests (StaticPool only ever hands out one anyway)."""
+    conn = engine.connect()
+    yield conn
+    conn.close()
+
+
+@pytest.fixture(scope="module")
+def module_transaction(connection):
+    """
+    Outer transaction spanning one test module.
+
+    Module-scoped seed data lives inside it and is rolled back once the module finishes.
+    """
+    transaction = connection.begin()
+    yield transaction
+    if transaction.is_active:
+        transaction.rollback()
+
+
+@pytest.fixture(scope="module")
+def seed_session(connection, module_transaction):
+    """Session that writes module-scoped seed rows straight into the module transaction."""
+    session = TestingSessionLocal(bind=connection, expire_on_commit=False)
+    yield session
+    session.close()
+
+
+@pytest.fixture(scope="session")
+def _reusable_session(connection):
+    """
+    One Session object shared by every test.
+
+    close() resets its identity map and transaction state, so db_session can hand the
+    same instance to each test instead of constructing a new Session every time.
+    """
+    session = TestingSessionLocal(bind=connection, join_transaction_mode="create_savepoint")
+    yield session
+    session.close()
 
 
 @pytest.fixture(scope="function")
-def db_session():
+def db_session(connection, module_transaction, _reusable_session):
     """
     Provide a transactional scope for each test.
 
-    This fixture creates a new database session for each test and automatically
-    rolls back all changes after the test completes, ensuring test isolation.
+    Each test runs inside a SAVEPOINT on the shared connection that is rolled back
+    after the test completes, ensuring test isolation. Session commits (including the
+    ones made by endpoints) only release nested savepoints, so they are undone too.
     """
-    connection = engine.connect()
-    transaction = connection.begin()
-    session = TestingSessionLocal(bind=connection)
+    savepoint = connection.begin_nested()
+    session = _reusable_session
 
     yield session
 
     session.close()
-    if transaction.is_active:
-        transaction.rollback()
-    connection.close()
+    if savepoint.is_active:
+        savepoint.rollback()
+
+
+@pytest.fixture(scope="session")
+def _test_client():
+    """A single TestClient for the whole run, so the app lifespan starts and stops only once."""
+    with TestClient(_get_app()) as test_client:
+        yield test_client
 
 
 @pytest.fixture(scope="function")
-def client(db_session: Session):
+def client(db_session: Session, _test_client: TestClient):
     """
     Provide a TestClient with overridden database dependency.
 
     This ensures all API calls during tests use the test database session.
     """
 
+    from database import get_db
+
     def override_get_db():
         try:
             yield db_session
         finally:
             pass  # Session cleanup handled by db_session fixture
 
+    app = _test_client.app
     app.dependency_overrides[get_db] = override_get_db
+    try:
+        yield _test_client
+    finally:
+        app.dependency_overrides.clear()
 
-    with TestClient(app) as test_client:
-        yield test_client
 
-    app.dependency_overrides.clear()
+# Optional: Fixtures for creating test data.
+# They are inserted once per test module; per-test changes to them are rolled back by db_session.
+@pytest.fixture(scope="module")
+def sample_resume(seed_session: Session):
+    """Create a sample resume for testing."""
+    from models import Resume
+
+    # A single INSERT ... RETURNING skips the unit-of-work flush and the refresh SELECT
+    return seed_session.scalar(
+        insert(Resume)
+        .values(name="Test Resume", content="# John Doe\nSoftware Engineer with 5 years experience", is_selected=False)
+        .returning(Resume)
+    )
+
+
+@pytest.fixture(scope="module")
+def sample_job(seed_session: Session, sample_resume):
+    """Create a sample job for testing."""
+    from models import Job, JobStatus
+
+    return seed_session.scalar(
+        insert(Job)
+        .values(
+            resume_id=sample_resume.id,
+            url="https://example.com/job",
+            company="Test Company",
+            title="Software Engineer",
+            job_description="Job description here",
+            resume="<h1>Resume</h1>",
+            cover_letter="<p>Cover Letter Content</p>",
+            match_score=85,
+            status=JobStatus.todo,
+        )
+        .returning(Job)
+    )
 
 
-# Optional: Fixture for creating test data
 @pytest.fixture
-def sample_resume(db_session: Session):
-    """Create a sample resume for testing."""
-    from models import Resume
+def empty_content_job(db_session: Session, sample_resume):
+    """A job with no generated resume or cover letter, for the "nothing to export" paths."""
+    from models import Job, JobStatus
 
-    resume = Resume(
-        name="Test Resume", content="# John Doe\nSoftware Engineer with 5 years experience", is_selected=False
+    job = Job(
+        resume_id=sample_resume.id,
+        url="https://example.com/job",
+        company="Empty Co",
+        title="Ghost",
+        job_description="JD",
+        resume="",  # Empty content
+        cover_letter="",
+        match_score=0,
+        status=JobStatus.todo,
     )
-    db_session.add(resume)
-    db_session.commit()
-    db_session.refresh(resume)
-    return resume
+    db_session.add(job)
+    db_session.flush()
+    return job
 
 
 @pytest.fixture
-def sample_job(db_session: Session, sample_resume):
-    """Create a sample job for testing."""
+def applied_job(db_session: Session, sample_resume):
+    """A job that has already been marked as applied."""
     from models import Job, JobStatus
 
     job = Job(
         resume_id=sample_resume.id,
         url="https://example.com/job",
         company="Test Company",
-        title="Software Engineer",
-        job_description="Job description here",
-        resume="<h1>Resume</h1>",
-        cover_letter="<p>Cover Letter Content</p>",
-        match_score=85,
-        status=JobStatus.todo,
+        title="Engineer",
+        job_description="JD",
+        resume="HTML",
+        cover_letter="HTML",
+        match_score=90,
+        status=JobStatus.applied,
     )
     db_session.add(job)
-    db_session.commit()
-    db_session.refresh(job)
+    db_session.flush()
     return job
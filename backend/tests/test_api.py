@@ -1,7 +1,9 @@
 import io
-from unittest.mock import AsyncMock, MagicMock, patch
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
+from sqlalchemy import delete, insert
 
 from agent import JDExtractionResult, ResumeMatchResult
 from models import Job, JobStatus
@@ -12,6 +14,102 @@ Fixtures like 'client', 'db_session', 'sample_resume', and 'sample_job'
 are provided by tests/conftest.py.
 """
 
+# Minimal PDF payload for the upload tests; text extraction itself is mocked
+_PDF_BYTES = b"%PDF-1.4\n1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj\n%%EOF"
+
+
+def _pdf_file(name="resume.pdf"):
+    """Multipart ``files`` mapping carrying the minimal PDF under the given filename."""
+    return {"file": (name, io.BytesIO(_PDF_BYTES), "application/pdf")}
+
+
+def _detail(response):
+    """Lower-cased error ``detail`` of a JSON response, for case-insensitive substring checks."""
+    return response.json().get("detail", "").lower()
+
+
+# Canonical agent outputs, validated once. Tests needing a variant use model_copy(update=...) instead of mutating them.
+_BASE_MATCH = ResumeMatchResult(
+    match_score=85,
+    resume_html="<h1>Resume</h1><p>This is a long enough resume content...</p>",
+    cover_letter_html="<p>Cover letter content that is also long enough...</p>",
+    company_name="Test Company",
+    job_title="Software Engineer",
+    key_improvements=["Added Python skills", "Emphasized leadership"],
+    extracted_job_description=(
+        "This is a sufficiently long and cleaned job description content that should pass "
+        "the validation checks in the main handler."
+    ),
+)
+
+_BASE_JD = JDExtractionResult(
+    match_score=None,
+    company_name="Fast Co",
+    job_title="Turbo Dev",
+    extracted_job_description=(
+        "This is a nicely formatted job description for the Fast Mode extraction test. "
+        "It should be long enough to pass validation and stored without a score."
+    ),
+)
+
+
+@pytest.fixture(autouse=True)
+def agents(monkeypatch):
+    """
+    Replace every agent's run() with an AsyncMock, so no test can reach a real LLM.
+
+    Tests configure the stub they need through .return_value / .side_effect.
+    """
+    import main
+
+    stubs = SimpleNamespace(
+        clean=AsyncMock(),
+        extraction=AsyncMock(),
+        extraction_no_tools=AsyncMock(),
+        resume=AsyncMock(),
+        resume_no_tools=AsyncMock(),
+    )
+    monkeypatch.setattr(main.clean_resume_agent, "run", stubs.clean)
+    monkeypatch.setattr(main.extraction_agent, "run", stubs.extraction)
+    monkeypatch.setattr(main.extraction_agent_no_tools, "run", stubs.extraction_no_tools)
+    monkeypatch.setattr(main.resume_agent, "run", stubs.resume)
+    monkeypatch.setattr(main.resume_agent_no_tools, "run", stubs.resume_no_tools)
+    return stubs
+
+
+@pytest.fixture
+def mock_html(monkeypatch):
+    """Replace WeasyPrint's HTML with a mock that renders fixed PDF bytes."""
+    mock_pdf_instance = MagicMock()
+    mock_pdf_instance.write_pdf.return_value = b"PDF content"
+    mock_html = MagicMock(return_value=mock_pdf_instance)
+    monkeypatch.setattr("main.HTML", mock_html)
+    return mock_html
+
+
+@pytest.fixture
+def mock_document(monkeypatch):
+    """Replace python-docx's Document with a mock to avoid building real files."""
+    mock_doc = MagicMock(return_value=MagicMock())
+    monkeypatch.setattr("main.Document", mock_doc)
+    return mock_doc
+
+
+@pytest.fixture
+def mock_extract(monkeypatch):
+    """Replace PDF text extraction with an AsyncMock; tests set its return_value."""
+    mock = AsyncMock()
+    monkeypatch.setattr("main.extract_text_from_pdf_async", mock)
+    return mock
+
+
+@pytest.fixture
+def mock_scrape(monkeypatch):
+    """Replace the URL scraper with an AsyncMock; tests set its return_value."""
+    mock = AsyncMock()
+    monkeypatch.setattr("main.scrape_job_description", mock)
+    return mock
+
 
 class TestRootEndpoint:
     """Test the root endpoint."""
@@ -28,27 +126,22 @@ class TestRootEndpoint:
 class TestResumeUpload:
     """Test resume upload endpoint."""
 
-    def test_upload_valid_pdf(self, client):
+    def test_upload_valid_pdf(self, client, mock_extract):
         """Test uploading a valid PDF file."""
-        # Create a minimal PDF
-        pdf_content = b"%PDF-1.4\n1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj\n%%EOF"
-
-        with patch("main.extract_text_from_pdf") as mock_extract:
-            mock_extract.return_value = (
-                "John Doe is a Software Engineer with 10 years of experience in Python, FastAPI, and React. "
-                "He has worked at several top tech companies and has a proven track record of "
-                "delivering high-quality software."
-            )
+        mock_extract.return_value = (
+            "John Doe is a Software Engineer with 10 years of experience in Python, FastAPI, and React. "
+            "He has worked at several top tech companies and has a proven track record of "
+            "delivering high-quality software."
+        )
 
-            files = {"file": ("resume.pdf", io.BytesIO(pdf_content), "application/pdf")}
-            response = client.post("/api/resumes/upload", files=files)
+        response = client.post("/api/resumes/upload", files=_pdf_file())
 
-            assert response.status_code == 200
-            data = response.json()
-            assert data["name"] == "resume"
-            assert "preview" in data
-            assert data["is_selected"] is True
-            assert "id" in data
+        assert response.status_code == 200
+        data = response.json()
+        assert data["name"] == "resume"
+        assert "preview" in data
+        assert data["is_selected"] is True
+        assert "id" in data
 
     def test_upload_non_pdf_file(self, client):
         """Test that non-PDF files are rejected."""
@@ -56,84 +149,79 @@ class TestResumeUpload:
         response = client.post("/api/resumes/upload", files=files)
 
         assert response.status_code == 400
-        assert "PDF" in response.json()["detail"]
+        assert "pdf" in _detail(response)
 
-    def test_upload_pdf_extraction_error(self, client):
-        """Test handling of PDF extraction errors."""
-        pdf_content = b"%PDF-1.4\n%%EOF"
-
-        with patch("main.extract_text_from_pdf") as mock_extract:
-            mock_extract.return_value = "Error: Failed to extract text"
-
-            files = {"file": ("resume.pdf", io.BytesIO(pdf_content), "application/pdf")}
-            response = client.post("/api/resumes/upload", files=files)
-
-            assert response.status_code == 400
-            assert "Error" in response.json()["detail"]
-
-    def test_upload_insufficient_content(self, client):
-        """Test handling of PDF with very little text."""
-        pdf_content = b"%PDF-1.4\n%%EOF"
-
-        with patch("main.extract_text_from_pdf") as mock_extract:
-            mock_extract.return_value = "Short text"  # Less than 50 chars
+    def test_upload_rejects_non_pdf_content(self, client):
+        """Test that a .pdf upload without a PDF header is rejected before extraction."""
+        files = {"file": ("resume.pdf", io.BytesIO(b"text content"), "application/pdf")}
+        response = client.post("/api/resumes/upload", files=files)
 
-            files = {"file": ("resume.pdf", io.BytesIO(pdf_content), "application/pdf")}
-            response = client.post("/api/resumes/upload", files=files)
+        assert response.status_code == 400
+        assert "valid pdf" in _detail(response)
+
+    @pytest.mark.parametrize(
+        ("extracted_text", "expected_detail"),
+        [
+            pytest.param("Error: Failed to extract text", "error", id="extraction_error"),
+            pytest.param("Short text", "insufficient", id="insufficient_content"),  # Less than 50 chars
+        ],
+    )
+    def test_upload_rejects_unusable_text(self, client, mock_extract, extracted_text, expected_detail):
+        """Test that extraction errors and near-empty PDFs are rejected."""
+        mock_extract.return_value = extracted_text
+        response = client.post("/api/resumes/upload", files=_pdf_file())
 
-            assert response.status_code == 400
-            assert "insufficient" in response.json()["detail"].lower()
+        assert response.status_code == 400
+        assert expected_detail in _detail(response)
 
-    def test_import_resume_from_url(self, client):
+    def test_import_resume_from_url(self, client, mock_scrape):
         """Test importing a resume from a URL."""
-        with patch("main.scrape_job_description", new_callable=AsyncMock) as mock_scrape:
-            mock_scrape.return_value = (
-                "This is a sufficiently long imported resume content that should pass the "
-                "validation check in the API endpoint."
-            )
+        mock_scrape.return_value = (
+            "This is a sufficiently long imported resume content that should pass the "
+            "validation check in the API endpoint."
+        )
 
-            payload = {"url": "https://linkedin.com/in/test", "name": "LinkedIn Bio"}
-            response = client.post("/api/resumes/import-url", json=payload)
+        payload = {"url": "https://linkedin.com/in/test", "name": "LinkedIn Bio"}
+        response = client.post("/api/resumes/import-url", json=payload)
 
-            assert response.status_code == 200
-            data = response.json()
-            assert data["name"] == "LinkedIn Bio"
-            assert data["is_selected"] is True
-            assert "sufficiently long" in data["preview"]
+        assert response.status_code == 200
+        data = response.json()
+        assert data["name"] == "LinkedIn Bio"
+        assert data["is_selected"] is True
+        assert "sufficiently long" in data["preview"]
 
 
 class TestResumeManual:
     """Test resume manual entry endpoint."""
 
-    @pytest.mark.asyncio
-    async def test_add_resume_manual_success(self, client):
+    def test_add_resume_manual_success(self, client, agents):
         """Test adding a valid resume text manually."""
         # Mock the cleaning agent
-        mock_result = MagicMock()
-        mock_result.output = (
-            "# John Doe\n\n"
-            "## Experience\n"
-            "- Software Engineer with 10 years of experience in Python, FastAPI, and React."
+        mock_result = SimpleNamespace(
+            output=(
+                "# John Doe\n\n"
+                "## Experience\n"
+                "- Software Engineer with 10 years of experience in Python, FastAPI, and React."
+            ),
         )
 
-        with patch("main.clean_resume_agent.run", new_callable=AsyncMock) as mock_agent:
-            mock_agent.return_value = mock_result
-
-            payload = {
-                "content": (
-                    "John Doe. Software Engineer with 10 years of experience in Python, FastAPI, and React. "
-                    "He has worked at several top tech companies and has a proven track record of "
-                    "delivering high-quality software."
-                ),
-                "name": "My Manual Resume",
-            }
-            response = client.post("/api/resumes/manual", json=payload)
-
-            assert response.status_code == 200
-            data = response.json()
-            assert data["name"] == "My Manual Resume"
-            assert "# John Doe" in data["preview"]
-            assert data["is_selected"] is True
+        agents.clean.return_value = mock_result
+
+        payload = {
+            "content": (
+                "John Doe. Software Engineer with 10 years of experience in Python, FastAPI, and React. "
+                "He has worked at several top tech companies and has a proven track record of "
+                "delivering high-quality software."
+            ),
+            "name": "My Manual Resume",
+        }
+        response = client.post("/api/resumes/manual", json=payload)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["name"] == "My Manual Resume"
+        assert "# John Doe" in data["preview"]
+        assert data["is_selected"] is True
 
     def test_add_resume_manual_too_short(self, client):
         """Test adding a resume that is too short."""
@@ -141,177 +229,131 @@ class TestResumeManual:
         response = client.post("/api/resumes/manual", json=payload)
 
         assert response.status_code == 400
-        assert "too short" in response.json()["detail"].lower()
+        assert "too short" in _detail(response)
 
 
 class TestAnalyzeJob:
     """Test job analysis endpoint."""
 
-    def test_analyze_job_success(self, client, sample_resume):
+    def test_analyze_job_success(self, client, sample_resume, agents):
         """Test successful job analysis."""
         # Mock the agent response
-        mock_result = MagicMock()
-        mock_result.output = ResumeMatchResult(
-            match_score=85,
-            resume_html="<h1>Resume</h1><p>This is a long enough resume content...</p>",
-            cover_letter_html="<p>Cover letter content that is also long enough...</p>",
-            company_name="Test Company",
-            job_title="Software Engineer",
-            key_improvements=["Added Python skills", "Emphasized leadership"],
-            extracted_job_description=(
-                "This is a sufficiently long and cleaned job description content that should pass "
-                "the validation checks in the main handler."
-            ),
-        )
+        mock_result = SimpleNamespace(output=_BASE_MATCH)
 
-        with patch("main.resume_agent.run", new_callable=AsyncMock) as mock_agent:
-            mock_agent.return_value = mock_result
+        agents.resume.return_value = mock_result
 
-            response = client.post(
-                "/api/analyze", json={"url": "https://example.com/job", "resume_id": sample_resume.id}
-            )
+        response = client.post("/api/analyze", json={"url": "https://example.com/job", "resume_id": sample_resume.id})
 
-            assert response.status_code == 200
-            data = response.json()
-            assert data["score"] == 85
-            assert "job_id" in data
-            assert "company" in data
+        assert response.status_code == 200
+        data = response.json()
+        assert data["score"] == 85
+        assert "job_id" in data
+        assert "company" in data
 
     def test_analyze_job_resume_not_found(self, client):
         """Test analysis with non-existent resume."""
         response = client.post("/api/analyze", json={"url": "https://example.com/job", "resume_id": 9999})
 
         assert response.status_code == 404
-        assert "not found" in response.json()["detail"].lower()
+        assert "not found" in _detail(response)
 
-    def test_analyze_job_agent_failure(self, client, sample_resume):
+    def test_analyze_job_agent_failure(self, client, sample_resume, agents):
         """Test handling of agent failures."""
-        with patch("main.resume_agent.run", new_callable=AsyncMock) as mock_agent:
-            mock_agent.side_effect = Exception("Agent error")
+        agents.resume.side_effect = Exception("Agent error")
 
-            response = client.post(
-                "/api/analyze", json={"url": "https://example.com/job", "resume_id": sample_resume.id}
-            )
+        response = client.post("/api/analyze", json={"url": "https://example.com/job", "resume_id": sample_resume.id})
 
-            assert response.status_code == 500
-            assert "failed" in response.json()["detail"].lower()
+        assert response.status_code == 500
+        assert "failed" in _detail(response)
 
-    def test_analyze_job_invalid_jd_extracted(self, client, sample_resume):
+    def test_analyze_job_invalid_jd_extracted(self, client, sample_resume, agents):
         """Test handling when agent fails to extract a proper JD."""
-        mock_result = MagicMock()
-        mock_result.output = ResumeMatchResult(
-            match_score=50,
-            resume_html="<h1>...</h1>",
-            cover_letter_html="<p>...</p>",
-            company_name="Unknown",
-            job_title="Unknown",
-            key_improvements=[],
-            extracted_job_description="Error: Could not read page",  # This marks it as invalid
+        mock_result = SimpleNamespace(
+            output=_BASE_MATCH.model_copy(
+                update={
+                    "match_score": 50,
+                    "extracted_job_description": "Error: Could not read page",  # This marks it as invalid
+                }
+            ),
         )
 
-        with patch("main.resume_agent.run", new_callable=AsyncMock) as mock_agent:
-            mock_agent.return_value = mock_result
+        agents.resume.return_value = mock_result
 
-            response = client.post(
-                "/api/analyze", json={"url": "https://example.com/bad", "resume_id": sample_resume.id}
-            )
+        response = client.post("/api/analyze", json={"url": "https://example.com/bad", "resume_id": sample_resume.id})
 
-            assert response.status_code == 400
-            assert "valid job description" in response.json()["detail"].lower()
+        assert response.status_code == 400
+        assert "valid job description" in _detail(response)
 
-    def test_analyze_job_fast_mode_success(self, client, sample_resume):
+    def test_analyze_job_fast_mode_success(self, client, sample_resume, agents):
         """Test JD-only extraction (Fast Mode) without resume matching."""
         # Mock the extraction agent response
-        mock_result = MagicMock()
-        mock_result.output = JDExtractionResult(
-            match_score=None,
-            company_name="Fast Co",
-            job_title="Turbo Dev",
-            extracted_job_description=(
-                "This is a nicely formatted job description for the Fast Mode extraction test. "
-                "It should be long enough to pass validation and stored without a score."
-            ),
-        )
+        mock_result = SimpleNamespace(output=_BASE_JD)
 
-        with patch("main.extraction_agent.run", new_callable=AsyncMock) as mock_agent:
-            mock_agent.return_value = mock_result
-
-            response = client.post(
-                "/api/analyze",
-                json={"url": "https://example.com/fast-job", "resume_id": sample_resume.id, "generate_cv": False},
-            )
+        agents.extraction.return_value = mock_result
 
-            assert response.status_code == 200
-            data = response.json()
-            assert data["score"] is None
-            assert data["company"] == "Fast Co"
-            assert "job_id" in data
-
-    def test_analyze_job_jd_only_triggers_extraction_agent(self, client, sample_resume):
-        """Verify that Fast Mode (generate_cv=False) ONLY uses extraction_agent."""
-        mock_extract = MagicMock()
-        mock_extract.output = JDExtractionResult(
-            match_score=None, company_name="C1", job_title="T1", extracted_job_description="JD"
+        response = client.post(
+            "/api/analyze",
+            json={"url": "https://example.com/fast-job", "resume_id": sample_resume.id, "generate_cv": False},
         )
 
-        # Patch both agents to see which one is called
-        with (
-            patch("main.extraction_agent.run", new_callable=AsyncMock) as mock_extract_run,
-            patch("main.resume_agent.run", new_callable=AsyncMock) as mock_resume_run,
-        ):
-            mock_extract_run.return_value = mock_extract
-
-            client.post(
-                "/api/analyze", json={"url": "http://j.ai", "resume_id": sample_resume.id, "generate_cv": False}
-            )
-
-            assert mock_extract_run.called
-            assert not mock_resume_run.called
-
-    def test_analyze_job_full_analysis_triggers_resume_agent(self, client, sample_resume):
-        """Verify that Full Mode (generate_cv=True) ONLY uses resume_agent."""
-        mock_resume = MagicMock()
-        mock_resume.output = ResumeMatchResult(
-            match_score=90,
-            resume_html="R",
-            cover_letter_html="C",
-            company_name="C1",
-            job_title="T1",
-            key_improvements=[],
-            extracted_job_description="JD",
+        assert response.status_code == 200
+        data = response.json()
+        assert data["score"] is None
+        assert data["company"] == "Fast Co"
+        assert "job_id" in data
+
+    @pytest.mark.parametrize(
+        ("generate_cv", "used", "unused", "output"),
+        [
+            pytest.param(False, "extraction", "resume", _BASE_JD, id="fast_mode_uses_extraction_agent"),
+            pytest.param(True, "resume", "extraction", _BASE_MATCH, id="full_analysis_uses_resume_agent"),
+        ],
+    )
+    def test_analyze_job_mode_selects_agent(self, client, sample_resume, agents, generate_cv, used, unused, output):
+        """Verify that generate_cv picks exactly one agent: extraction_agent for Fast Mode, resume_agent otherwise."""
+        getattr(agents, used).return_value = SimpleNamespace(output=output)
+
+        client.post(
+            "/api/analyze", json={"url": "http://j.ai", "resume_id": sample_resume.id, "generate_cv": generate_cv}
         )
 
-        with (
-            patch("main.extraction_agent.run", new_callable=AsyncMock) as mock_extract_run,
-            patch("main.resume_agent.run", new_callable=AsyncMock) as mock_resume_run,
-        ):
-            mock_resume_run.return_value = mock_resume
-
-            client.post("/api/analyze", json={"url": "http://j.ai", "resume_id": sample_resume.id, "generate_cv": True})
-
-            assert mock_resume_run.called
-            assert not mock_extract_run.called
+        assert getattr(agents, used).called
+        assert not getattr(agents, unused).called
 
 
 class TestGetJobs:
     """Test job listing endpoint."""
 
-    def test_get_jobs_empty_list(self, client):
-        """Test getting jobs when none exist."""
-        response = client.get("/api/jobs")
-
-        assert response.status_code == 200
-        assert response.json() == []
+    @pytest.mark.parametrize("count", [0, 1, 5])
+    def test_list_jobs(self, client, db_session, sample_resume, count):
+        """Test that the listing returns exactly the stored jobs."""
+        # Module-scoped seed jobs may exist already; start from an empty table (rolled back after the test)
+        db_session.execute(delete(Job))
+        if count:
+            db_session.execute(
+                insert(Job),
+                [
+                    {
+                        "resume_id": sample_resume.id,
+                        "url": f"https://example.com/job/{i}",
+                        "company": f"Company {i}",
+                        "title": "Software Engineer",
+                        "job_description": "JD",
+                        "resume": "",
+                        "cover_letter": "",
+                        "match_score": 0,
+                        "status": JobStatus.todo,
+                    }
+                    for i in range(count)
+                ],
+            )
 
-    def test_get_jobs_with_data(self, client, sample_job):
-        """Test getting jobs with existing data."""
-        # sample_job fixture already provides one job
         response = client.get("/api/jobs")
 
         assert response.status_code == 200
-        data = response.json()
-        assert len(data) == 1
-        assert data[0]["company"] == "Test Company"
+        assert sorted(job["company"] for job in response.json()) == [f"Company {i}" for i in range(count)]
+        # The list is a summary; the large text fields are only returned by the single-job endpoint
+        assert all("job_description" not in job and "resume" not in job for job in response.json())
 
 
 class TestGetJob:
@@ -326,73 +368,101 @@ class TestGetJob:
         assert data["company"] == "Test Company"
         assert data["match_score"] == 85
 
-    def test_get_job_not_found(self, client):
-        """Test getting a non-existent job."""
-        response = client.get("/api/jobs/9999")
-
-        assert response.status_code == 404
-
 
+@pytest.mark.usefixtures("mock_html")
 class TestGeneratePDF:
     """Test PDF generation endpoint."""
 
-    def test_generate_pdf_success(self, client, sample_job):
+    def test_generate_pdf_success(self, client, sample_job, mock_html):
         """Test successful PDF generation for resume."""
-        with patch("main.HTML") as mock_html:
-            mock_pdf_instance = MagicMock()
-            mock_pdf_instance.write_pdf.return_value = b"PDF content"
-            mock_html.return_value = mock_pdf_instance
+        import main
 
-            response = client.get(f"/api/jobs/{sample_job.id}/pdf")
+        response = client.get(f"/api/jobs/{sample_job.id}/pdf")
 
-            assert response.status_code == 200
-            assert response.headers["content-type"] == "application/pdf"
-            assert "attachment" in response.headers["content-disposition"]
-            assert "resume" in response.headers["content-disposition"]
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/pdf"
+        assert "attachment" in response.headers["content-disposition"]
+        assert "resume" in response.headers["content-disposition"]
+        # Every render reuses the app's font configuration
+        mock_html.return_value.write_pdf.assert_called_once_with(font_config=main.PDF_FONT_CONFIG)
 
-    def test_generate_pdf_cover_letter_success(self, client, sample_job):
-        """Test successful PDF generation for cover letter."""
-        with patch("main.HTML") as mock_html:
-            mock_pdf_instance = MagicMock()
-            mock_pdf_instance.write_pdf.return_value = b"PDF content"
-            mock_html.return_value = mock_pdf_instance
+    def test_generate_pdf_reuses_cached_render(self, client, sample_job, mock_html, tmp_path, monkeypatch):
+        """Test that an unchanged document is rendered once when the PDF cache is enabled."""
+        import main
 
-            # Updated query param syntax for client.get
-            response = client.get(f"/api/jobs/{sample_job.id}/pdf", params={"pdf_type": "cover"})
+        monkeypatch.setattr(main.config, "PDF_CACHE_DIR", str(tmp_path))
 
-            assert response.status_code == 200
-            assert response.headers["content-type"] == "application/pdf"
-            assert "attachment" in response.headers["content-disposition"]
-            assert "cover" in response.headers["content-disposition"]
+        first = client.get(f"/api/jobs/{sample_job.id}/pdf")
+        second = client.get(f"/api/jobs/{sample_job.id}/pdf")
 
-    def test_generate_pdf_job_not_found(self, client):
-        """Test PDF generation for non-existent job."""
-        response = client.get("/api/jobs/9999/pdf")
+        assert first.content == second.content == b"PDF content"
+        assert mock_html.call_count == 1
+        assert len(list(tmp_path.glob("*.pdf"))) == 1
 
-        assert response.status_code == 404
+    def test_generate_pdf_renders_when_cache_unreadable(self, client, sample_job, mock_html, tmp_path, monkeypatch):
+        """Test that an unreadable cache entry falls through to a fresh render instead of failing."""
+        import main
 
-    def test_generate_pdf_no_content(self, client, db_session, sample_resume):
-        """Test PDF generation when no content exists."""
-        # Create a job with empty resume
-        job = Job(
-            resume_id=sample_resume.id,
-            url="https://example.com/job",
-            company="Test Company",
-            title="Engineer",
-            job_description="JD",
-            resume="",  # Empty content
-            cover_letter="",
-            match_score=90,
-            status=JobStatus.todo,
-        )
-        db_session.add(job)
-        db_session.commit()
-        db_session.refresh(job)
+        monkeypatch.setattr(main.config, "PDF_CACHE_DIR", str(tmp_path))
+        monkeypatch.setattr(main.Path, "read_bytes", MagicMock(side_effect=PermissionError("denied")))
+
+        response = client.get(f"/api/jobs/{sample_job.id}/pdf")
+
+        assert response.status_code == 200
+        assert response.content == b"PDF content"
+        assert mock_html.call_count == 1
+
+    def test_generate_pdf_serves_cache_hit_when_timestamp_update_fails(
+        self, client, sample_job, mock_html, tmp_path, monkeypatch
+    ):
+        """Test that a read-only cache still serves hits instead of rendering again."""
+        import main
+
+        monkeypatch.setattr(main.config, "PDF_CACHE_DIR", str(tmp_path))
+        client.get(f"/api/jobs/{sample_job.id}/pdf")
+        monkeypatch.setattr(main.os, "utime", MagicMock(side_effect=PermissionError("read-only")))
+
+        response = client.get(f"/api/jobs/{sample_job.id}/pdf")
+
+        assert response.status_code == 200
+        assert response.content == b"PDF content"
+        assert mock_html.call_count == 1
+
+    def test_prune_pdf_cache_skips_files_removed_concurrently(self, tmp_path, monkeypatch):
+        """Test that a file deleted by another worker mid-prune doesn't stop the prune."""
+        import os
+
+        import main
+
+        old, new = tmp_path / "old.pdf", tmp_path / "new.pdf"
+        old.write_bytes(b"old")
+        new.write_bytes(b"new")
+        os.utime(old, (0, 0))
+        gone = tmp_path / "gone.pdf"
+        monkeypatch.setattr(main, "PDF_CACHE_MAX_FILES", 1)
+        monkeypatch.setattr(main.Path, "glob", lambda self, pattern: iter([gone, old, new]))
+
+        main.prune_pdf_cache(tmp_path)
 
-        response = client.get(f"/api/jobs/{job.id}/pdf")
+        assert not old.exists()
+        assert new.exists()
+
+    def test_generate_pdf_cover_letter_success(self, client, sample_job):
+        """Test successful PDF generation for cover letter."""
+        # Updated query param syntax for client.get
+        response = client.get(f"/api/jobs/{sample_job.id}/pdf", params={"pdf_type": "cover"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/pdf"
+        assert "attachment" in response.headers["content-disposition"]
+        assert "cover" in response.headers["content-disposition"]
+
+    def test_generate_pdf_no_content(self, client, empty_content_job):
+        """Test PDF generation when no content exists."""
+        response = client.get(f"/api/jobs/{empty_content_job.id}/pdf")
 
         assert response.status_code == 400
-        assert "content available" in response.json()["detail"]
+        assert "content available" in _detail(response)
 
 
 class TestDeleteJob:
@@ -411,112 +481,85 @@ class TestDeleteJob:
         deleted_job = db_session.query(Job).filter(Job.id == job_id).first()
         assert deleted_job is None
 
-    def test_delete_job_not_found(self, client):
-        """Test deleting a non-existent job."""
-        response = client.delete("/api/jobs/9999")
-
-        assert response.status_code == 404
-
 
 class TestRegenerateJob:
     """Test job content regeneration endpoint."""
 
-    @pytest.mark.asyncio
-    async def test_regenerate_job_success(self, client, sample_job, sample_resume):
+    def test_regenerate_job_success(self, client, sample_job, sample_resume, agents):
         """Test successful job content regeneration."""
         # Mock the agent response
-        mock_result = MagicMock()
-        mock_result.output = ResumeMatchResult(
-            match_score=95,
-            resume_html="<h1>Updated Resume</h1>",
-            cover_letter_html="<p>Updated Cover letter</p>",
-            company_name="Test Company",
-            job_title="Software Engineer",
-            key_improvements=["Even more Python", "AWS certification added"],
-            extracted_job_description="Updated JD content",
+        mock_result = SimpleNamespace(
+            output=_BASE_MATCH.model_copy(
+                update={
+                    "match_score": 95,
+                    "resume_html": "<h1>Updated Resume</h1>",
+                    "cover_letter_html": "<p>Updated Cover letter</p>",
+                    "key_improvements": ["Even more Python", "AWS certification added"],
+                    "extracted_job_description": "Updated JD content",
+                }
+            ),
         )
 
-        with patch("main.resume_agent_no_tools.run", new_callable=AsyncMock) as mock_agent:
-            mock_agent.return_value = mock_result
+        agents.resume_no_tools.return_value = mock_result
 
-            payload = {"prompt": "tech skill should have postgres instead of mysql"}
-            response = client.post(f"/api/jobs/{sample_job.id}/regenerate", json=payload)
+        payload = {"prompt": "tech skill should have postgres instead of mysql"}
+        response = client.post(f"/api/jobs/{sample_job.id}/regenerate", json=payload)
 
-            assert response.status_code == 200
-            data = response.json()
-            # In our current regeneration logic, we focus on the cover letter
-            # The resume stays as its original (un-tailored) self from the job record
-            assert data["cover_letter"] == "<p>Updated Cover letter</p>"
-            assert data["match_score"] == 95
-            assert data["resume"] == sample_job.resume
+        assert response.status_code == 200
+        data = response.json()
+        # In our current regeneration logic, we focus on the cover letter
+        # The resume stays as its original (un-tailored) self from the job record
+        assert data["cover_letter"] == "<p>Updated Cover letter</p>"
+        assert data["match_score"] == 95
+        assert data["resume"] == sample_job.resume
 
-    @pytest.mark.asyncio
-    async def test_regenerate_job_no_prompt(self, client, sample_job):
+    def test_regenerate_job_no_prompt(self, client, sample_job, agents):
         """Test regeneration without a prompt (uses default)."""
-        mock_result = MagicMock()
-        mock_result.output = ResumeMatchResult(
-            match_score=90,
-            resume_html="<h1>Regenerated</h1>",
-            cover_letter_html="<p>Regenerated</p>",
-            company_name="Test Company",
-            job_title="Software Engineer",
-            extracted_job_description="Regenerated JD",
-        )
-
-        with patch("main.resume_agent_no_tools.run", new_callable=AsyncMock) as mock_agent:
-            mock_agent.return_value = mock_result
+        mock_result = SimpleNamespace(output=_BASE_MATCH)
 
-            # Send empty JSON or no prompt
-            response = client.post(f"/api/jobs/{sample_job.id}/regenerate", json={})
+        agents.resume_no_tools.return_value = mock_result
 
-            assert response.status_code == 200
-            # Should have called agent even without prompt
-            assert mock_agent.called
+        # Send empty JSON or no prompt
+        response = client.post(f"/api/jobs/{sample_job.id}/regenerate", json={})
 
-    def test_regenerate_job_not_found(self, client):
-        """Test regeneration for non-existent job."""
-        response = client.post("/api/jobs/9999/regenerate", json={"prompt": "test"})
-        assert response.status_code == 404
+        assert response.status_code == 200
+        # Should have called agent even without prompt
+        assert agents.resume_no_tools.called
 
-    @pytest.mark.asyncio
-    async def test_regenerate_job_agent_error(self, client, sample_job):
+    def test_regenerate_job_agent_error(self, client, sample_job, agents):
         """Test regeneration failure handling."""
-        with patch("main.resume_agent_no_tools.run", new_callable=AsyncMock) as mock_agent:
-            mock_agent.side_effect = Exception("Regeneration failed")
+        agents.resume_no_tools.side_effect = Exception("Regeneration failed")
 
-            response = client.post(f"/api/jobs/{sample_job.id}/regenerate", json={"prompt": "fail me"})
+        response = client.post(f"/api/jobs/{sample_job.id}/regenerate", json={"prompt": "fail me"})
 
-            assert response.status_code == 500
-            assert "failed" in response.json()["detail"].lower()
+        assert response.status_code == 500
+        assert "failed" in _detail(response)
 
-    @pytest.mark.asyncio
-    async def test_regenerate_job_missing_data(self, client, sample_job):
+    def test_regenerate_job_missing_data(self, client, sample_job, agents):
         """Test regeneration when agent returns incomplete data."""
-        mock_result = MagicMock()
 
         # Use a simple object for data that has no attributes,
         # so getattr(data, 'match_score', default) returns the default.
         class EmptyData:
             pass
 
-        mock_result.output = EmptyData()
+        mock_result = SimpleNamespace(output=EmptyData())
 
-        with patch("main.resume_agent_no_tools.run", new_callable=AsyncMock) as mock_agent:
-            mock_agent.return_value = mock_result
+        agents.resume_no_tools.return_value = mock_result
 
-            response = client.post(f"/api/jobs/{sample_job.id}/regenerate", json={"prompt": "break stuff"})
+        response = client.post(f"/api/jobs/{sample_job.id}/regenerate", json={"prompt": "break stuff"})
 
-            # Since we couldn't find ANY data attributes in mock_result,
-            # our fallback returns the result object itself, but it has no resume_html etc.
-            # So the conditional updates in main.py won't happen, and it will return the ORIGINAL values.
-            # BUT if extract_agent_data returns something that fails 'if data:', it returns 500.
-            # In our implementation: 'if data:' on MagicMock is True.
-            # Then getattr(data, 'resume_html', None) returns None for MagicMock.
-            # The code should actually return a 200 with original values in this specific mock case,
-            # or we can test the error path more strictly.
+        # Since we couldn't find ANY data attributes in mock_result,
+        # our fallback returns the result object itself, but it has no resume_html etc.
+        # So the conditional updates in main.py won't happen, and it will return the ORIGINAL values.
+        # BUT if extract_agent_data returns something that fails 'if data:', it returns 500.
+        # In our implementation: 'if data:' on MagicMock is True.
+        # Then getattr(data, 'resume_html', None) returns None for MagicMock.
+        # The code should actually return a 200 with original values in this specific mock case,
+        # or we can test the error path more strictly.
 
-            assert response.status_code == 200
-            # Returns original sample_job values since new ones are None
+        assert response.status_code == 200
+        # Returns original sample_job values since new ones are None
 
 
 class TestUpdateJob:
@@ -543,143 +586,99 @@ class TestUpdateJob:
         data = response.json()
         assert data["status"] == JobStatus.applied
 
-    def test_toggle_applied_false_reverts_to_todo(self, client, db_session, sample_resume):
+    def test_toggle_applied_false_reverts_to_todo(self, client, applied_job):
         """Test that unticking applied reverts status to todo."""
-        # Create a job that is already applied
-        job = Job(
-            resume_id=sample_resume.id,
-            url="https://example.com/job",
-            company="Test Company",
-            title="Engineer",
-            job_description="JD",
-            resume="HTML",
-            cover_letter="HTML",
-            match_score=90,
-            status=JobStatus.applied,
-        )
-        db_session.add(job)
-        db_session.commit()
-        db_session.refresh(job)
-
         payload = {"applied": False}
-        response = client.patch(f"/api/jobs/{job.id}", json=payload)
+        response = client.patch(f"/api/jobs/{applied_job.id}", json=payload)
 
         assert response.status_code == 200
         data = response.json()
         assert data["status"] == JobStatus.todo
 
-    def test_update_job_not_found(self, client):
-        """Test updating a non-existent job."""
-        response = client.patch("/api/jobs/9999", json={"status": "applied"})
-        assert response.status_code == 404
-
 
+@pytest.mark.usefixtures("mock_html")
 class TestResumePDF:
     """Test resume PDF generation endpoint."""
 
     def test_generate_resume_pdf_success(self, client, sample_resume):
         """Test successful PDF generation for a resume."""
-        with patch("main.HTML") as mock_html:
-            mock_pdf_instance = MagicMock()
-            mock_pdf_instance.write_pdf.return_value = b"PDF content"
-            mock_html.return_value = mock_pdf_instance
-
-            response = client.get(f"/api/resumes/{sample_resume.id}/pdf")
-
-            assert response.status_code == 200
-            assert response.headers["content-type"] == "application/pdf"
-            assert "attachment" in response.headers["content-disposition"]
-            # The filename in header is safe-formatted, so we check if a part of it exists
-            # sample_resume.name is "Test Resume" -> safe is "Test_Resume.pdf"
-            assert "Test" in response.headers["content-disposition"]
-
-    def test_generate_resume_pdf_not_found(self, client):
-        """Test PDF generation for non-existent resume."""
-        response = client.get("/api/resumes/9999/pdf")
-        assert response.status_code == 404
+        response = client.get(f"/api/resumes/{sample_resume.id}/pdf")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/pdf"
+        assert "attachment" in response.headers["content-disposition"]
+        # The filename in header is safe-formatted, so we check if a part of it exists
+        # sample_resume.name is "Test Resume" -> safe is "Test_Resume.pdf"
+        assert "Test" in response.headers["content-disposition"]
 
 
+@pytest.mark.usefixtures("mock_document")
 class TestDOCXGeneration:
     """Test DOCX generation endpoints for both resumes and jobs."""
 
     def test_generate_resume_docx_success(self, client, sample_resume):
         """Test successful DOCX generation for a resume."""
-        # Mock Document and its save method to avoid external dependencies
-        with patch("main.Document") as mock_doc:
-            mock_instance = MagicMock()
-            mock_doc.return_value = mock_instance
+        response = client.get(f"/api/resumes/{sample_resume.id}/docx")
 
-            response = client.get(f"/api/resumes/{sample_resume.id}/docx")
-
-            assert response.status_code == 200
-            assert (
-                response.headers["content-type"]
-                == "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-            )
-            assert "attachment" in response.headers["content-disposition"]
-            assert "Test_Resume.docx" in response.headers["content-disposition"]
-
-    def test_generate_resume_docx_not_found(self, client):
-        """Test DOCX generation for non-existent resume."""
-        response = client.get("/api/resumes/9999/docx")
-        assert response.status_code == 404
+        assert response.status_code == 200
+        assert (
+            response.headers["content-type"]
+            == "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+        )
+        assert "attachment" in response.headers["content-disposition"]
+        assert "Test_Resume.docx" in response.headers["content-disposition"]
 
     def test_generate_job_docx_success(self, client, sample_job):
         """Test successful DOCX generation for a job resume."""
-        with patch("main.Document") as mock_doc:
-            mock_instance = MagicMock()
-            mock_doc.return_value = mock_instance
-
-            response = client.get(f"/api/jobs/{sample_job.id}/docx")
+        response = client.get(f"/api/jobs/{sample_job.id}/docx")
 
-            assert response.status_code == 200
-            assert (
-                response.headers["content-type"]
-                == "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-            )
-            assert "attachment" in response.headers["content-disposition"]
-            # raw_filename = f"{job.company}_{job.title}_{type}.docx"
-            # Test_Company_Software_Engineer_resume.docx
-            assert "Test_Company" in response.headers["content-disposition"]
-            assert "resume.docx" in response.headers["content-disposition"]
+        assert response.status_code == 200
+        assert (
+            response.headers["content-type"]
+            == "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+        )
+        assert "attachment" in response.headers["content-disposition"]
+        # raw_filename = f"{job.company}_{job.title}_{type}.docx"
+        # Test_Company_Software_Engineer_resume.docx
+        assert "Test_Company" in response.headers["content-disposition"]
+        assert "resume.docx" in response.headers["content-disposition"]
 
     def test_generate_job_docx_cover_letter_success(self, client, sample_job):
         """Test successful DOCX generation for a job cover letter."""
-        with patch("main.Document") as mock_doc:
-            mock_instance = MagicMock()
-            mock_doc.return_value = mock_instance
-
-            response = client.get(f"/api/jobs/{sample_job.id}/docx", params={"type": "cover"})
-
-            assert response.status_code == 200
-            assert (
-                response.headers["content-type"]
-                == "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-            )
-            assert "cover.docx" in response.headers["content-disposition"]
+        response = client.get(f"/api/jobs/{sample_job.id}/docx", params={"type": "cover"})
 
-    def test_generate_job_docx_not_found(self, client):
-        """Test DOCX generation for non-existent job."""
-        response = client.get("/api/jobs/9999/docx")
-        assert response.status_code == 404
-
-    def test_generate_job_docx_no_content(self, client, db_session, sample_resume):
-        """Test DOCX generation when no content exists."""
-        job = Job(
-            resume_id=sample_resume.id,
-            url="https://example.com/job",
-            company="Empty Co",
-            title="Ghost",
-            job_description="JD",
-            resume="",  # Empty
-            cover_letter=None,
-            match_score=0,
-            status=JobStatus.todo,
+        assert response.status_code == 200
+        assert (
+            response.headers["content-type"]
+            == "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
         )
-        db_session.add(job)
-        db_session.commit()
-        db_session.refresh(job)
+        assert "cover.docx" in response.headers["content-disposition"]
 
-        response = client.get(f"/api/jobs/{job.id}/docx")
+    def test_generate_job_docx_no_content(self, client, empty_content_job):
+        """Test DOCX generation when no content exists."""
+        response = client.get(f"/api/jobs/{empty_content_job.id}/docx")
         assert response.status_code == 400
-        assert "content available" in response.json()["detail"]
+        assert "content available" in _detail(response)
+
+
+class TestNotFound:
+    """Test that every per-item endpoint answers 404 for unknown ids."""
+
+    @pytest.mark.parametrize(
+        ("method", "path", "body"),
+        [
+            ("GET", "/api/jobs/9999", None),
+            ("GET", "/api/jobs/9999/pdf", None),
+            ("GET", "/api/jobs/9999/docx", None),
+            ("DELETE", "/api/jobs/9999", None),
+            ("PATCH", "/api/jobs/9999", {"status": "applied"}),
+            ("POST", "/api/jobs/9999/regenerate", {"prompt": "test"}),
+            ("GET", "/api/resumes/9999/pdf", None),
+            ("GET", "/api/resumes/9999/docx", None),
+        ],
+    )
+    def test_unknown_id_returns_404(self, client, method, path, body):
+        """Test requests for a non-existent job or resume."""
+        response = client.request(method, path, json=body)
+
+        assert response.status_code == 404
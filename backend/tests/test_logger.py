@@ -62,3 +62,27 @@ class TestLogger:
         with patch("config.DEBUG", False):
             log_error("Test Error Message 2")
             mock_console.print.assert_called_once()
+
+    @patch("logger.console")
+    @patch("config.DEBUG", True)
+    def test_log_error_prints_traceback_when_debugging(self, mock_console):
+        """Test log_error(exc_info=True) adds the handled exception's traceback in debug mode."""
+        try:
+            raise ValueError("broken pdf")
+        except ValueError:
+            log_error("Test Error Message", exc_info=True)
+
+        mock_console.print.assert_called_once()
+        mock_console.print_exception.assert_called_once()
+
+    @patch("logger.console")
+    @patch("config.DEBUG", False)
+    def test_log_error_skips_traceback_when_not_debugging(self, mock_console):
+        """Test log_error(exc_info=True) prints only the message outside debug mode."""
+        try:
+            raise ValueError("broken pdf")
+        except ValueError:
+            log_error("Test Error Message", exc_info=True)
+
+        mock_console.print.assert_called_once()
+        mock_console.print_exception.assert_not_called()
@@ -0,0 +1,66 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.pool import StaticPool
+
+from migrations import MIGRATIONS, run_migrations
+
+
+@pytest.fixture
+def legacy_engine():
+    """An in-memory database with resumes and jobs tables from before the timestamp columns and status index existed."""
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE resumes (id INTEGER PRIMARY KEY, name VARCHAR, content VARCHAR)"))
+        conn.execute(
+            text("INSERT INTO resumes (id, name, content) VALUES (1, 'Fenced', :fenced), (2, 'Plain', :plain)"),
+            {"fenced": "```markdown\n# John Doe\n- Python\n```", "plain": "# Jane Doe"},
+        )
+        conn.execute(text("CREATE TABLE jobs (id INTEGER PRIMARY KEY, status VARCHAR(9))"))
+    yield engine
+    engine.dispose()
+
+
+class TestRunMigrations:
+    """Test the versioned migration runner."""
+
+    def test_applies_all_migrations_to_legacy_database(self, legacy_engine):
+        """Test that pending migrations upgrade an old database and are recorded."""
+        run_migrations(legacy_engine)
+
+        columns = {column["name"] for column in inspect(legacy_engine).get_columns("resumes")}
+        assert {"created_at", "updated_at"} <= columns
+        assert "ix_jobs_status" in {index["name"] for index in inspect(legacy_engine).get_indexes("jobs")}
+
+        with legacy_engine.connect() as conn:
+            contents = dict(conn.execute(text("SELECT id, content FROM resumes")).all())
+            versions = set(conn.execute(text("SELECT version FROM schema_migrations")).scalars())
+            missing_timestamps = conn.execute(text("SELECT COUNT(*) FROM resumes WHERE created_at IS NULL")).scalar()
+
+        assert contents == {1: "# John Doe\n- Python", 2: "# Jane Doe"}
+        assert versions == {version for version, _ in MIGRATIONS}
+        assert missing_timestamps == 0
+
+    def test_skips_already_applied_migrations(self, legacy_engine):
+        """Test that a second run does not re-apply recorded migrations."""
+        run_migrations(legacy_engine)
+
+        with legacy_engine.begin() as conn:
+            conn.execute(text("UPDATE resumes SET content = '```\nfenced again\n```' WHERE id = 2"))
+
+        run_migrations(legacy_engine)
+
+        with legacy_engine.connect() as conn:
+            content = conn.execute(text("SELECT content FROM resumes WHERE id = 2")).scalar()
+        assert content.startswith("```")
+
+    def test_fresh_database_only_records_versions(self):
+        """Test that migrations are no-ops (but recorded) before the tables exist."""
+        engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+
+        run_migrations(engine)
+
+        assert inspect(engine).get_table_names() == ["schema_migrations"]
+        with engine.connect() as conn:
+            versions = set(conn.execute(text("SELECT version FROM schema_migrations")).scalars())
+        assert versions == {version for version, _ in MIGRATIONS}
+        engine.dispose()
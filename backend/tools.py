@@ -1,14 +1,43 @@
-import os
-import tempfile
+import asyncio
+import hashlib
+import io
+import threading
+import time
+from collections import OrderedDict
+from itertools import chain, islice
+from urllib.parse import urlparse
 
 import fitz  # PyMuPDF
 import httpx
-from markitdown import MarkItDown
 
+import config
 from logger import log_ai_interaction, log_debug, log_error
 
-# Initialize MarkItDown once
-md_converter = MarkItDown()
+# MarkItDown is only the fallback for PDFs without a usable text layer, and importing it is slow (it pulls in
+# converters for every format it supports), so it is imported and initialized once, on first use
+_md_converter = None
+_md_converter_lock = threading.Lock()
+
+# PyMuPDF's default text flags minus ligature and whitespace preservation (plain text is all the agents need),
+# plus joining words hyphenated across line breaks
+FITZ_TEXT_FLAGS = fitz.TEXT_MEDIABOX_CLIP | fitz.TEXT_CID_FOR_UNKNOWN_UNICODE | fitz.TEXT_DEHYPHENATE
+
+# Extracted text of recently uploaded PDFs, keyed by a digest of the file bytes (users often re-upload
+# the same resume). Only successful extractions are stored; the lock guards the dict, not the extraction.
+PDF_CACHE_SIZE = 64
+_pdf_cache: OrderedDict[bytes, str] = OrderedDict()
+_pdf_cache_lock = threading.Lock()
+
+
+def _get_md_converter():
+    """Returns the shared MarkItDown converter, importing and creating it on the first call."""
+    global _md_converter
+    with _md_converter_lock:
+        if _md_converter is None:
+            from markitdown import MarkItDown
+
+            _md_converter = MarkItDown()
+    return _md_converter
 
 
 def extract_text_from_pdf(file_bytes: bytes) -> str:
@@ -16,43 +45,74 @@ def extract_text_from_pdf(file_bytes: bytes) -> str:
     Extracts text from a PDF file and converts it to Markdown.
 
     Tries multiple methods:
-    1. MarkItDown (Best for structure/formatting)
-    2. PyMuPDF (Best for raw text extraction from complex layouts)
+    1. PyMuPDF (Fast, reads the text layer directly)
+    2. MarkItDown (Slower; only used when PyMuPDF finds too little text)
+
+    Results are cached per file content, so re-uploading the same PDF skips the extraction.
+    """
+    # Reject non-PDF bytes up front; the header may follow a few junk bytes, which PDF readers tolerate
+    if b"%PDF-" not in file_bytes[:1024]:
+        log_error("Uploaded file has no PDF header.")
+        return "Error: The file does not appear to be a valid PDF."
+
+    key = hashlib.blake2b(file_bytes, digest_size=16).digest()
+    with _pdf_cache_lock:
+        if key in _pdf_cache:
+            _pdf_cache.move_to_end(key)
+            log_debug(f"PDF extraction cache hit for {len(file_bytes)} bytes.")
+            return _pdf_cache[key]
+
+    content = _extract_text_from_pdf(file_bytes)
+
+    if not content.startswith("Error:"):
+        with _pdf_cache_lock:
+            _pdf_cache[key] = content
+            if len(_pdf_cache) > PDF_CACHE_SIZE:
+                _pdf_cache.popitem(last=False)
+    return content
+
+
+async def extract_text_from_pdf_async(file_bytes: bytes) -> str:
     """
+    Runs extract_text_from_pdf in a worker thread so the blocking parse doesn't stall the event loop.
+    """
+    return await asyncio.to_thread(extract_text_from_pdf, file_bytes)
+
+
+def _extract_text_from_pdf(file_bytes: bytes) -> str:
     try:
         log_debug(f"Starting PDF text extraction for {len(file_bytes)} bytes...")
 
-        # Method 1: MarkItDown with temp file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_pdf:
-            temp_pdf.write(file_bytes)
-            temp_path = temp_pdf.name
-
+        # Method 1: PyMuPDF (fitz) reads the text layer directly; enough for almost every text-based resume
         content = ""
+        has_text_layer = True
         try:
-            result = md_converter.convert(temp_path)
-            content = result.markdown.strip()
+            doc = fitz.open(stream=file_bytes, filetype="pdf")
+            pages = iter(doc)
+            # No text on the first pages means the PDF is likely scanned, and MarkItDown (which also only reads the
+            # text layer) would find nothing either; the rest of the document is still read, it may hold the text
+            sample = [page.get_text("text", flags=FITZ_TEXT_FLAGS) for page in islice(pages, 2)]
+            has_text_layer = len("".join(sample).strip()) >= 20
+            rest = (page.get_text("text", flags=FITZ_TEXT_FLAGS) for page in pages)
+            content = "\n".join(chain(sample, rest)).strip()
+            doc.close()
         except Exception as e:
-            log_debug(f"MarkItDown failed: {e}")
-        finally:
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-
-        # Method 2: Fallback to PyMuPDF (fitz) if MarkItDown failed or returned too little content
-        if not content or len(content) < 50:
-            log_debug(f"MarkItDown result insufficient ({len(content)} chars), trying PyMuPDF (fitz)...")
+            log_debug(f"PyMuPDF extraction failed: {e}")
+
+        # Method 2: Fallback to MarkItDown (read from memory) if fitz failed or returned too little content
+        if not has_text_layer and len(content) < 50:
+            log_debug("No text layer on the first pages (likely scanned), skipping MarkItDown.")
+        elif not content or len(content) < 50:
+            log_debug(f"PyMuPDF result insufficient ({len(content)} chars), trying MarkItDown...")
             try:
-                doc = fitz.open(stream=file_bytes, filetype="pdf")
-                text_parts = []
-                for page in doc:
-                    text_parts.append(page.get_text())
-                fitz_content = "\n".join(text_parts).strip()
-                doc.close()
-
-                # Only use Fitz content if it's better than what we already have
-                if len(fitz_content) > len(content):
-                    content = fitz_content
+                result = _get_md_converter().convert_stream(io.BytesIO(file_bytes), file_extension=".pdf")
+                md_content = result.markdown.strip()
+
+                # Only use MarkItDown content if it's better than what we already have
+                if len(md_content) > len(content):
+                    content = md_content
             except Exception as e:
-                log_debug(f"PyMuPDF extraction failed: {e}")
+                log_debug(f"MarkItDown failed: {e}")
 
         # Final validation
         if not content or len(content.strip()) < 50:
@@ -67,36 +127,151 @@ def extract_text_from_pdf(file_bytes: bytes) -> str:
         return content
 
     except Exception as e:
-        log_error(f"Unexpected PDF extraction failure: {str(e)}")
-        import traceback
-
-        print(traceback.format_exc())
+        log_error(f"Unexpected PDF extraction failure: {str(e)}", exc_info=True)
         return f"Error: Failed to extract text from PDF. Details: {str(e)}"
 
 
+def prewarm_pdf_extraction() -> None:
+    """
+    Runs a one-page PDF through PyMuPDF and MarkItDown so their lazy setup happens before the first upload.
+
+    Calls the extractors directly, so nothing is added to the PDF cache; failures are logged and ignored.
+    """
+    try:
+        doc = fitz.open()
+        doc.new_page().insert_text((72, 72), "JobFit")
+        pdf_bytes = doc.tobytes()
+        doc.close()
+
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+            for page in doc:
+                page.get_text("text", flags=FITZ_TEXT_FLAGS)
+        _get_md_converter().convert_stream(io.BytesIO(pdf_bytes), file_extension=".pdf")
+        log_debug("PDF extraction prewarmed.")
+    except Exception as e:
+        log_debug(f"PDF extraction prewarm failed: {e}")
+
+
+def strip_markdown_fences(content: str) -> str:
+    """
+    Removes a code fence (e.g. ```markdown ... ```) wrapped around the whole content.
+
+    LLMs sometimes wrap their Markdown output in a fence; the opening fence line and
+    a closing fence line are dropped, everything in between is kept as-is.
+    """
+    content = content.strip()
+    if not content.startswith("```"):
+        return content
+
+    # Locate the fence lines by index instead of splitting into a list of lines
+    first_newline = content.find("\n")
+    if first_newline == -1:
+        return ""
+    body = content[first_newline + 1 :]
+
+    # Remove last line if it's a closing fence
+    last_newline = body.rfind("\n")
+    if body[last_newline + 1 :].strip() == "```":
+        body = body[: max(last_newline, 0)]
+    return body
+
+
+# Upper bound on a scraped page; Jina returns the page as text, and real job descriptions are far smaller.
+MAX_SCRAPE_BYTES = 2_000_000
+# Longest job URL accepted; longer input is almost certainly pasted garbage
+MAX_URL_LENGTH = 2048
+# Characters of a scraped page shown in the payload log
+SCRAPE_LOG_PREVIEW_CHARS = 2000
+
+# Scraped job descriptions keyed by URL, stored with their fetch time and served for config.JD_CACHE_TTL seconds
+# (users often analyze the same posting against several resumes). Only successful scrapes are stored.
+JD_CACHE_SIZE = 512
+_jd_cache: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+# Shared client for the scraper, so repeated scrapes reuse pooled keep-alive connections to r.jina.ai
+# instead of doing a fresh TCP + TLS handshake per call. Created on first use, closed on app shutdown.
+_http_client: httpx.AsyncClient | None = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Returns the shared scraper client, creating it if it doesn't exist yet (or was closed)."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            # Fail fast when Jina is unreachable, but give it time to render slow job pages
+            timeout=httpx.Timeout(20.0, connect=3.0),
+            follow_redirects=True,
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Closes the shared scraper client; called from the app's shutdown."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def _is_valid_url(url: str) -> bool:
+    """Checks that url is a plausible http(s) URL, so malformed input never costs a round trip to Jina."""
+    if len(url) > MAX_URL_LENGTH or any(c <= " " or c == "\x7f" for c in url):
+        return False
+    try:
+        parsed = urlparse(url)
+    except ValueError:  # e.g. an unbalanced IPv6 bracket
+        return False
+    return parsed.scheme in ("http", "https") and bool(parsed.hostname)
+
+
 async def scrape_job_description(url: str) -> str:
     """
     Scrapes a job description from a URL using Jina Reader (r.jina.ai).
     """
-    if not url.startswith(("http://", "https://")):
+    url = url.strip()  # Pasted URLs often carry a trailing space or newline
+    if not _is_valid_url(url):
         return "Error: Invalid URL. Please provide a full URL starting with http:// or https://"
 
+    if config.JD_CACHE_TTL > 0:
+        entry = _jd_cache.get(url)
+        if entry and time.monotonic() - entry[0] < config.JD_CACHE_TTL:
+            log_debug(f"Job description cache hit for URL: {url}")
+            return entry[1]
+
     jina_url = f"https://r.jina.ai/{url}"
     try:
         log_debug(f"Scraping job description from URL: {url} using Jina...")
-        async with httpx.AsyncClient(timeout=20.0, follow_redirects=True) as client:
-            response = await client.get(jina_url)
+        buf = bytearray()
+        async with _get_client().stream("GET", jina_url) as response:
             response.raise_for_status()
+            # Read the body in chunks and stop at the cap, so an oversized page is never fully buffered
+            async for chunk in response.aiter_bytes(65536):
+                buf.extend(chunk)
+                if len(buf) > MAX_SCRAPE_BYTES:
+                    log_debug(f"Scraped page exceeds {MAX_SCRAPE_BYTES} bytes, truncating.")
+                    del buf[MAX_SCRAPE_BYTES:]
+                    break
 
-            content = response.text.strip()
-            if not content or len(content) < 100:
-                log_error(f"Scraped content was too short or empty ({len(content) if content else 0} chars).")
-                return "Error: The job description page was empty, too short, or could not be read correctly."
+        # Decode with the charset the response declares (httpx falls back to UTF-8)
+        content = buf.decode(response.encoding or "utf-8", errors="replace").strip()
+        if not content or len(content) < 100:
+            log_error(f"Scraped content was too short or empty ({len(content) if content else 0} chars).")
+            return "Error: The job description page was empty, too short, or could not be read correctly."
 
-            log_ai_interaction("SCRAPED CONTENT (JINA)", content, "yellow")
+        # Highlighting a whole page in the payload log is slow, so only a preview is printed
+        preview = content[:SCRAPE_LOG_PREVIEW_CHARS]
+        if len(content) > SCRAPE_LOG_PREVIEW_CHARS:
+            preview += f"\n\n... ({len(content) - SCRAPE_LOG_PREVIEW_CHARS} more characters)"
+        log_ai_interaction("SCRAPED CONTENT (JINA)", preview, "yellow")
 
-            log_debug(f"Successfully scraped {len(content)} characters from the job description.")
-            return content
+        log_debug(f"Successfully scraped {len(content)} characters from the job description.")
+        if config.JD_CACHE_TTL > 0:
+            _jd_cache[url] = (time.monotonic(), content)
+            _jd_cache.move_to_end(url)
+            if len(_jd_cache) > JD_CACHE_SIZE:
+                _jd_cache.popitem(last=False)
+        return content
 
     except httpx.HTTPStatusError as e:
         log_error(f"Jina scraper failed with HTTP {e.response.status_code}")
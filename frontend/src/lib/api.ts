@@ -9,9 +9,10 @@ interface BackendJob {
   title: string;
   match_score: number;
   url: string;
-  job_description: string;
-  resume: string;
-  cover_letter: string;
+  // Only returned by the single-job endpoint; the job list leaves them out
+  job_description?: string;
+  resume?: string;
+  cover_letter?: string;
   status: string;
   resume_id?: number;
 }